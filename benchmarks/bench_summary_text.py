@@ -0,0 +1,51 @@
+"""
+Compares read-time cost of getting plain text summaries.
+
+Before: every read parses raw HTML summary with BeautifulSoup.
+After: text is converted once at ingest by 'html_to_text'
+and every read just takes stored 'summary_text'.
+
+Usage:
+
+    python -m benchmarks.bench_summary_text [ENTRIES] [READS]
+
+"""
+import sys
+import timeit
+from bs4 import BeautifulSoup
+from rss_reader.one_shot import html_to_text
+
+
+summary = ("[Image 2: Some title][2]\n<p>The former President is "
+           + "<em>likely</em> signalling to prosecutors&nbsp;that he "
+           + "won&rsquo;t go quietly, <a href=\"https://www.example.com\">"
+           + "so they had better beware</a>.</p><p>Second paragraph.</p>")
+
+
+def main(entries=1000, reads=10):
+    items = [{"summary": summary} for k in range(entries)]
+
+    def read_before():
+        for item in items:
+            BeautifulSoup(item["summary"], "html5lib").get_text()
+
+    def ingest():
+        texts = html_to_text([item["summary"] for item in items])
+        for item, text in zip(items, texts):
+            item["summary_text"] = text
+
+    def read_after():
+        for item in items:
+            item["summary_text"]
+
+    before = timeit.timeit(read_before, number=reads)
+    ingest_time = timeit.timeit(ingest, number=1)
+    after = timeit.timeit(read_after, number=reads)
+    print(f"{entries} entries, {reads} reads")
+    print(f"read with HTML parsing:      {before:.4f} s")
+    print(f"ingest with html_to_text:    {ingest_time:.4f} s")
+    print(f"read precomputed text:       {after:.4f} s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
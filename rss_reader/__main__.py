@@ -1,10 +1,28 @@
 from rss_reader import one_shot
+from rss_reader import export
+from rss_reader import server
 from rss_reader.arg_parser import parse_args
 import sys
 
 def cli():
     args = parse_args(sys.argv[1:])
-    one_shot.read_rss(args.url, args.limit, args.to_json, args.verbose, args.date)
+    if args.serve is not None:
+        server.serve(args.serve, args.verbose)
+        return
+    if args.export is not None:
+        date_from = args.date if args.date_from is None else args.date_from
+        date_to = args.date if args.date_to is None else args.date_to
+        export.export_cache(args.export, args.export_format, args.url,
+                            date_from, date_to, args.verbose)
+        return
+    if args.memory_budget is not None:
+        memory_budget = args.memory_budget * 1024 * 1024
+    else:
+        memory_budget = None
+    one_shot.read_rss(args.url, args.limit, args.to_json, args.verbose, args.date,
+                      args.media_dir if args.fetch_media else None,
+                      args.media_max_size * 1024 * 1024,
+                      memory_budget)
 
 if __name__ == "__main__":
     cli()
@@ -1,8 +1,24 @@
 import argparse
+import time
 from rss_reader._version import __version__
+from rss_reader import media
+from rss_reader.export import export_formats
 
 prog_name = "rss_reader"
 
+def cache_date(value):
+    """
+    Checks that the date is given in YYYYMMDD format.
+    """
+    try:
+        if len(value) != 8 or not value.isdigit():
+            raise ValueError
+        time.strptime(value, "%Y%m%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid date '{value}', expected YYYYMMDD")
+    return value
+
 def parse_args(args):
     parser = argparse.ArgumentParser(
         description='Pure Python command-line RSS reader',
@@ -51,13 +67,95 @@ def parse_args(args):
         '--date',
         dest='date',
         action='store',
-        type=str,
+        type=cache_date,
         nargs='?',
         default=None,
         help='get cached feed for the given date'
         )
+    parser.add_argument(
+        '--export',
+        dest='export',
+        metavar='PATH',
+        action='store',
+        type=str,
+        default=None,
+        help='export cached feeds to the given file'
+        )
+    parser.add_argument(
+        '--export-format',
+        dest='export_format',
+        action='store',
+        type=str,
+        choices=export_formats,
+        default='jsonl',
+        help='export file format: gzipped JSON Lines, CSV or Parquet'
+        )
+    parser.add_argument(
+        '--from-date',
+        dest='date_from',
+        action='store',
+        type=cache_date,
+        default=None,
+        help='export cached feeds starting from the given date'
+        )
+    parser.add_argument(
+        '--to-date',
+        dest='date_to',
+        action='store',
+        type=cache_date,
+        default=None,
+        help='export cached feeds up to the given date'
+        )
+    parser.add_argument(
+        '--serve',
+        dest='serve',
+        metavar='HOST:PORT',
+        action='store',
+        type=str,
+        nargs='?',
+        const='localhost:8080',
+        default=None,
+        help='serve cached feeds as JSON over HTTP (default: localhost:8080)'
+        )
+    parser.add_argument(
+        '--fetch-media',
+        dest='fetch_media',
+        action='store_const',
+        const=True,
+        default=False,
+        help='download entries images into local media store'
+        )
+    parser.add_argument(
+        '--media-dir',
+        dest='media_dir',
+        metavar='DIR',
+        action='store',
+        type=str,
+        default=media.default_store_dir,
+        help=f'media store directory (default: {media.default_store_dir})'
+        )
+    parser.add_argument(
+        '--media-max-size',
+        dest='media_max_size',
+        metavar='MB',
+        action='store',
+        type=int,
+        default=media.default_max_bytes // (1024 * 1024),
+        help='maximum total size of the media store in megabytes'
+        )
+    parser.add_argument(
+        '--memory-budget',
+        dest='memory_budget',
+        metavar='MB',
+        action='store',
+        type=int,
+        default=None,
+        help='parse and cache feed entries in chunks to fit the memory budget '
+             + '(feed document itself is still parsed by feedparser as a whole)'
+        )
     parsed_args = parser.parse_args(args)
-    if (parsed_args.date is None and parsed_args.url is None):
+    if (parsed_args.date is None and parsed_args.url is None
+            and parsed_args.export is None and parsed_args.serve is None):
         parser.error("Mandatory positional argument 'URL' is missing")
 
     return parsed_args
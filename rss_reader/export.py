@@ -0,0 +1,184 @@
+"""
+Exports cached feeds.
+
+Streams cached feeds and their entries from the cache database
+into compact formats suitable for bulk loading: gzip-compressed
+JSON Lines, CSV and (if pyarrow is installed) Parquet.
+Rows are written one by one (or in small batches for Parquet)
+so the output is never built in memory as a whole.
+Cache is read one chunk file at a time, so memory use does not
+depend on the amount of cached history.
+
+Usage:
+
+    export_cache(path, export_format="jsonl", feed_url=None,
+                 date_from=None, date_to=None)
+
+"""
+import csv
+import gzip
+import json
+import logging
+import os
+from rss_reader import one_shot
+from rss_reader.one_shot import logger
+
+
+columns = [
+    "cache_date",
+    "feed",
+    "feed_url",
+    "title",
+    "date",
+    "link",
+    "summary",
+    "summary_text",
+    "article_content",
+    "links",
+]
+
+parquet_batch_size = 1000
+
+
+class ExportFormatNotSupported(Exception):
+    pass
+
+
+def iter_cached_entries(feed_url=None, date_from=None, date_to=None):
+    """
+    Yields cached entries one by one as flat rows.
+
+    Input parameters:
+        feed_url - Only entries of this feed are yielded if provided.
+        date_from - First cache date (YYYYMMDD) to be included.
+        date_to - Last cache date (YYYYMMDD) to be included.
+    """
+    for cache_date in one_shot.get_cached_dates(date_from, date_to):
+        for feed_dir in one_shot.get_cached_feed_dirs(cache_date, feed_url):
+            yield from iter_feed_entries(cache_date, feed_dir)
+
+
+def iter_feed_entries(cache_date, feed_dir):
+    """
+    Yields entries of one cached feed as flat rows.
+    Feed replaced by a concurrent writer is read again, unless
+    some of its rows are already yielded, then it is cut short.
+    """
+    count = 0
+    for attempt in range(one_shot.cache_read_attempts):
+        try:
+            content = one_shot.read_json(
+                os.path.join(feed_dir, one_shot.feed_file_name))
+            for items in one_shot.iter_cached_chunks(feed_dir):
+                for item in items:
+                    row = {
+                        "cache_date": cache_date,
+                        "feed": content["feed"],
+                        "feed_url": content["url"],
+                    }
+                    row.update(item)
+                    yield row
+                    count += 1
+            return
+        except FileNotFoundError:
+            if count > 0:
+                logger.error(f"Feed {feed_dir} was replaced while exported, "
+                             + f"only {count} entries are exported")
+                return
+
+
+def write_jsonl(rows, path):
+    """
+    Writes rows as gzip-compressed JSON Lines.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for row in rows:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def write_csv(rows, path):
+    """
+    Writes rows as CSV with a header.
+    Nested 'links' list is stored as JSON string.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            row["links"] = json.dumps(row.get("links", []), ensure_ascii=False)
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(rows, path):
+    """
+    Writes rows as Parquet file in batches.
+    Requires pyarrow to be installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportFormatNotSupported(
+            "Parquet export requires 'pyarrow' package to be installed")
+
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            row["links"] = json.dumps(row.get("links", []), ensure_ascii=False)
+            batch.append({name: row.get(name) for name in columns})
+            if len(batch) >= parquet_batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch.clear()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+writers = {
+    "jsonl": write_jsonl,
+    "csv": write_csv,
+    "parquet": write_parquet,
+}
+
+export_formats = list(writers)
+
+
+def export_cache(path, export_format="jsonl", feed_url=None,
+                 date_from=None, date_to=None, verbose=False):
+    """
+    Exports cached entries into the file.
+
+    Input parameters:
+        path - Output file path.
+        export_format - One of 'jsonl' (gzipped), 'csv' or 'parquet'.
+        feed_url - Only entries of this feed are exported if provided.
+        date_from - First cache date (YYYYMMDD) to be exported.
+        date_to - Last cache date (YYYYMMDD) to be exported.
+        verbose - Prints additional information if 'True'.
+
+    Returns:
+        The amount of exported entries
+    """
+    if verbose:
+        logger.setLevel(logging.INFO)
+    else:
+        logger.setLevel(logging.ERROR)
+    if export_format not in writers:
+        raise ExportFormatNotSupported(
+            f"Unknown export format '{export_format}'")
+    one_shot.migrate_legacy_cache()
+    logger.info(f"Exporting cache to {path} as {export_format}")
+    rows = iter_cached_entries(feed_url, date_from, date_to)
+    count = writers[export_format](rows, path)
+    logger.info(f"Exported {count} entries")
+    return count
@@ -0,0 +1,124 @@
+"""
+Article extractors registry.
+
+Maps article host to the extractor that knows how to find
+cover image, title and body on the article web-page.
+Extractors are declared as selector specs (CSS selectors)
+which are compiled once when the extractor is registered.
+
+Additional extractors are provided by installed packages through
+'rss_reader.extractors' entry points. Entry point name is the host
+and its value is either a spec dict or an Extractor instance.
+Entry point is loaded only on the first lookup of its host.
+Entry point that fails to load is logged once and its host
+is treated as having no extractor.
+
+Usage:
+
+    extractor = get_extractor("https://news.yahoo.com/some-article.html")
+
+"""
+from importlib import metadata
+from urllib.parse import urlparse
+import logging
+import soupsieve
+
+
+logger = logging.getLogger("rss_reader.one_shot")
+
+
+entry_point_group = "rss_reader.extractors"
+
+
+class ExtractorSpecError(Exception):
+    pass
+
+
+class Extractor:
+    """
+    Compiled selector spec for the articles of one host.
+
+    Spec keys:
+        title - selector of the article title element (required)
+        body - selector of the article body element (required)
+        cover - selector of the cover figure (optional)
+        tweet - selector of embedded tweet wrapper in the body (optional)
+    """
+    required = ("title", "body")
+    optional = ("cover", "tweet")
+
+    def __init__(self, host, spec):
+        self.host = host
+        for key in self.required:
+            if key not in spec:
+                raise ExtractorSpecError(
+                    f"Extractor spec for '{host}' has no '{key}' selector")
+        for key in self.required + self.optional:
+            selector = spec.get(key)
+            try:
+                compiled = soupsieve.compile(selector) if selector else None
+            except (soupsieve.SelectorSyntaxError, TypeError) as e:
+                raise ExtractorSpecError(
+                    f"Invalid '{key}' selector in extractor spec for '{host}': {e}")
+            setattr(self, key, compiled)
+
+
+yahoo = Extractor("news.yahoo.com", {
+    "cover": "figure.caas-cover",
+    "title": "header.caas-title-wrapper",
+    "body": "div.caas-body",
+    "tweet": "div.twitter-tweet-wrapper",
+})
+
+registry = {
+    yahoo.host: yahoo,
+}
+
+_entry_points = None
+
+
+def register(host, spec):
+    """
+    Registers extractor for the host.
+    'spec' could be either selector spec dict or Extractor instance.
+    """
+    extractor = spec if isinstance(spec, Extractor) else Extractor(host, spec)
+    registry[host.lower()] = extractor
+    return extractor
+
+
+def find_entry_point(host):
+    """
+    Returns not yet loaded entry point for the host or None.
+    Installed entry points are indexed by host on the first call.
+    """
+    global _entry_points
+    if _entry_points is None:
+        eps = metadata.entry_points()
+        if hasattr(eps, "select"):
+            eps = eps.select(group=entry_point_group)
+        else:
+            eps = eps.get(entry_point_group, [])
+        _entry_points = {ep.name.lower(): ep for ep in eps}
+    return _entry_points.get(host)
+
+
+def get_extractor(url):
+    """
+    Returns extractor registered for the URL host or None.
+    Loads extractor from the entry point if it isn't registered yet.
+    Hosts without extractor are remembered as None in the registry.
+    """
+    host = urlparse(url).netloc.lower()
+    if host in registry:
+        return registry[host]
+    extractor = None
+    entry_point = find_entry_point(host)
+    if entry_point is not None:
+        try:
+            extractor = register(host, entry_point.load())
+        except Exception as e:
+            logger.error(f"Unable to load extractor for '{host}': "
+                         + f"{type(e).__name__}: {e}")
+    registry[host] = extractor
+    return extractor
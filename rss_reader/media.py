@@ -0,0 +1,248 @@
+"""
+Prefetches media of parsed feed entries.
+
+Downloads images found in entries links concurrently
+into local content-addressed store, where every file is named
+by SHA-256 hash of its content. Already downloaded URLs are
+taken from the store index and not fetched again.
+Downloads are streamed to disk and stopped as soon as
+the store would exceed its size limit.
+Local file path is recorded as 'local_path' into each image link.
+
+Usage:
+
+    fetch_media(items, store_dir=default_store_dir,
+                max_workers=8, max_bytes=500 * 1024 * 1024)
+
+    or, to fetch media of several chunks of items:
+
+    store = MediaStore(store_dir, max_bytes)
+    store.fetch(items)
+    store.save()
+
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import platform
+import tempfile
+import threading
+from requests import get, RequestException
+
+
+logger = logging.getLogger("rss_reader.one_shot")
+
+tempdir = "/tmp" if platform.system() == "Darwin" else tempfile.gettempdir()
+default_store_dir = os.path.join(tempdir, "rss_reader_media")
+default_max_bytes = 500 * 1024 * 1024
+default_max_workers = 8
+request_timeout = 30
+download_chunk_size = 64 * 1024
+index_file_name = "index.json"
+
+
+def get_extension(url, content_type):
+    """
+    Gets file extension from URL path or from response content type.
+    """
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    if 1 < len(extension) <= 5 and extension[1:].isalnum():
+        return extension
+    if content_type:
+        return mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+    return ""
+
+
+class MediaSizeLimitReached(Exception):
+    pass
+
+
+class StoreBudget:
+    """
+    Thread-safe running total of the media store size.
+    """
+    def __init__(self, size, max_bytes):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def fits(self, size):
+        with self.lock:
+            return self.size + size <= self.max_bytes
+
+    def reserve(self, size):
+        with self.lock:
+            if self.size + size > self.max_bytes:
+                return False
+            self.size += size
+            return True
+
+    def release(self, size):
+        with self.lock:
+            self.size -= size
+
+
+def download(url, store_dir, budget):
+    """
+    Streams URL content into the store, hashing it on the fly.
+
+    Raises MediaSizeLimitReached as soon as 'Content-Length'
+    or downloaded bytes would exceed the store budget.
+    Returns (url, path, written bytes) tuple.
+    """
+    size = 0
+    part_path = None
+    try:
+        with get(url, stream=True, timeout=request_timeout) as response:
+            response.raise_for_status()
+            length = response.headers.get("Content-Length", "")
+            if length.isdigit() and not budget.fits(int(length)):
+                raise MediaSizeLimitReached(
+                    f"Media store size limit reached, skipping {url}")
+            digest = hashlib.sha256()
+            fd, part_path = tempfile.mkstemp(dir=store_dir, suffix=".part")
+            with os.fdopen(fd, "wb") as file:
+                for chunk in response.iter_content(download_chunk_size):
+                    if not budget.reserve(len(chunk)):
+                        raise MediaSizeLimitReached(
+                            f"Media store size limit reached, skipping {url}")
+                    size += len(chunk)
+                    digest.update(chunk)
+                    file.write(chunk)
+            extension = get_extension(url, response.headers.get("Content-Type"))
+        digest = digest.hexdigest()
+        path = os.path.join(store_dir, digest[:2], digest + extension)
+        with budget.lock:
+            if os.path.exists(path):
+                os.remove(part_path)
+                budget.size -= size
+                size = 0
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(part_path, path)
+        return url, path, size
+    except BaseException:
+        if part_path is not None and os.path.exists(part_path):
+            os.remove(part_path)
+        budget.release(size)
+        raise
+
+
+def load_index(store_dir):
+    """
+    Loads URL to local path mapping of the store.
+    Entries which files were removed from the store are skipped.
+    Missing or unreadable index is treated as empty.
+    """
+    try:
+        with open(os.path.join(store_dir, index_file_name), "r") as file:
+            index = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError) as e:
+        logger.error(f"Unable to read media store index, starting empty: {e}")
+        return {}
+    if not isinstance(index, dict):
+        return {}
+    return {url: path for url, path in index.items() if os.path.exists(path)}
+
+
+def save_index(store_dir, index):
+    """
+    Writes index atomically, so interrupted write never breaks it.
+    """
+    fd, part_path = tempfile.mkstemp(dir=store_dir, suffix=".part")
+    with os.fdopen(fd, "w") as file:
+        json.dump(index, file)
+    os.replace(part_path, os.path.join(store_dir, index_file_name))
+
+
+def get_store_size(store_dir):
+    size = 0
+    for root, dirs, files in os.walk(store_dir):
+        for name in files:
+            if name != index_file_name and not name.endswith(".part"):
+                size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+class MediaStore:
+    """
+    Content-addressed media store.
+
+    Store size and index are read once on creation and kept
+    up to date in memory, so fetching media of many chunks
+    doesn't walk the store again. Index is written by 'save'.
+    """
+    def __init__(self, store_dir=default_store_dir, max_bytes=default_max_bytes,
+                 max_workers=default_max_workers):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.max_workers = max_workers
+        self.index = load_index(store_dir)
+        self.budget = StoreBudget(get_store_size(store_dir), max_bytes)
+        self.changed = False
+
+    def fetch(self, items):
+        """
+        Downloads images of given feed items into the store.
+        Returns the amount of newly stored bytes.
+        """
+        written = 0
+        media_links = [link for item in items for link in item["links"]
+                       if link["type"] == "image"]
+        urls = {link["src"] for link in media_links} - self.index.keys()
+        logger.info(f"Fetching {len(urls)} media files into {self.store_dir}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # futures are not kept here, as_completed drops each one it yields
+            for future in as_completed(
+                    [executor.submit(download, url, self.store_dir, self.budget)
+                     for url in urls]):
+                try:
+                    url, path, size = future.result()
+                except MediaSizeLimitReached as e:
+                    logger.info(str(e))
+                    continue
+                except RequestException as e:
+                    logger.error(f"Unable to fetch media: {e}")
+                    continue
+                written += size
+                self.index[url] = path
+                self.changed = True
+
+        for link in media_links:
+            if link["src"] in self.index:
+                link["local_path"] = self.index[link["src"]]
+        logger.info(f"Stored {written} bytes of media")
+        return written
+
+    def save(self):
+        if self.changed:
+            save_index(self.store_dir, self.index)
+            self.changed = False
+
+
+def fetch_media(items, store_dir=default_store_dir,
+                max_workers=default_max_workers, max_bytes=default_max_bytes):
+    """
+    Downloads images of given feed items into the local store.
+
+    Input parameters:
+        items - Parsed feed items with 'links' lists.
+        store_dir - Directory of content-addressed media store.
+        max_workers - The amount of concurrent downloads.
+        max_bytes - Maximum total size of the store in bytes.
+            Downloads that do not fit are stopped and discarded.
+
+    Returns:
+        The amount of newly stored bytes
+    """
+    store = MediaStore(store_dir, max_bytes, max_workers)
+    written = store.fetch(items)
+    store.save()
+    return written
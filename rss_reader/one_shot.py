@@ -9,9 +9,8 @@ Usage:
     read_rss(rss_url, limit=3, to_json=False, verbose=False):
 
 """
-from urllib.parse import urlparse
 import feedparser
-from requests import get
+from requests import get, RequestException
 from bs4 import BeautifulSoup
 import time
 import json
@@ -19,9 +18,14 @@ import logging
 from logging import StreamHandler, Formatter
 import sys
 import os
-from tinydb import TinyDB, Query
+import hashlib
+import shutil
 import tempfile
 import platform
+import re
+import html
+from rss_reader import extractors
+from rss_reader import media
 
 
 logger = logging.getLogger(__name__)
@@ -30,8 +34,26 @@ handler = StreamHandler(stream=sys.stdout)
 handler.setFormatter(Formatter(fmt='%(asctime)s [%(levelname)s] %(message)s'))
 logger.addHandler(handler)
 
+# Batch separator is excluded from patterns so no match spans two entries
+block_tag_re = re.compile(r"<(?:br|/p|/div|/li|/h\d|/tr)\b[^>\x00]*>", re.IGNORECASE)
+hidden_tag_re = re.compile(r"<(script|style)\b[^\x00]*?</\1\s*>", re.IGNORECASE)
+# "<" not followed by a tag name, like in "2 < 3", is text
+tag_re = re.compile(r"</?[a-zA-Z!?][^>\x00]*>")
+spaces_re = re.compile(r"[ \t\r\f\v\xa0]+")
+blank_lines_re = re.compile(r" ?\n[ \n]*")
+batch_separator = "\x00"
+# Parsed entries take several times more memory than their JSON,
+# so a chunk is cached once its JSON reaches this part of the budget
+chunk_budget_divider = 8
+
 tempdir = "/tmp" if platform.system() == "Darwin" else tempfile.gettempdir()
-db_path = os.path.join(tempdir, "rss_reader_cache.json")
+cache_dir = os.path.join(tempdir, "rss_reader_cache")
+# Single-file cache of earlier versions, moved into cache_dir on first use
+legacy_db_path = os.path.join(tempdir, "rss_reader_cache.json")
+feed_file_name = "feed.json"
+# Feed directories being written or removed, skipped by readers
+part_suffix = ".part"
+cache_read_attempts = 5
 
 class FeedparserFeedFormattingError(Exception):
     pass
@@ -45,6 +67,9 @@ class ElementNotFound(Exception):
 class CachedFeedtNotFound(Exception):
     pass
 
+class InvalidCacheDate(Exception):
+    pass
+
 
 def exception_handler(
         exception_type,
@@ -79,28 +104,31 @@ def get_image_attrs(img):
         raise ElementAttributeNotFound("Required img attribute 'src' or 'data-src not found'")
     return {"alt": alt, "src": src}
 
-def parse_article(url):
+def parse_article(url, extractor=None):
     """
     Parses given article html page.
 
     Searches article body, title, title image
     and images and tweets in the article body itself.
     Appends image links into existing 'links' list variable.
-    Works only for Yahhoo news only.
+    Uses selectors of the given extractor, Yahoo news by default.
 
     Input parameters:
         url - URL to the article that needs to be parsed
+        extractor - Extractor with compiled selectors for the article host
 
     Returns:
         Formatted article body as a string
 
     """
+    if extractor is None:
+        extractor = extractors.yahoo
 
     parsed_text = ""
     article = get(url).content
     soup1 = BeautifulSoup(article, 'html5lib')
 
-    cover = soup1.find('figure', class_='caas-cover')
+    cover = extractor.cover.select_one(soup1) if extractor.cover else None
     if cover:
         cover_img = cover.find("img")
         if cover_img:
@@ -113,15 +141,18 @@ def parse_article(url):
             parsed_text += (f"[Image {len(links)}: "
                             + f"{cover_img_attrs['alt']}][{len(links)}]\n")
     try:
-        article_title = soup1.find('header',
-                                    class_='caas-title-wrapper').get_text()
+        article_title = extractor.title.select_one(soup1).get_text()
     except AttributeError:
-        raise ElementNotFound("Expected 'header' element wasn't found during article parsing")
+        raise ElementNotFound(
+            f"Expected '{extractor.title.pattern}' element wasn't found "
+            + f"during {extractor.host} article parsing")
     parsed_text += article_title + "\n\n"
 
-    article_body = soup1.find('div', class_='caas-body')
+    article_body = extractor.body.select_one(soup1)
     if article_body == None:
-        raise ElementNotFound("Expected 'div' element wasn't found during article parsing")
+        raise ElementNotFound(
+            f"Expected '{extractor.body.pattern}' element wasn't found "
+            + f"during {extractor.host} article parsing")
     for el in article_body.children:
         if el.name == "figure":
             img = el.find("img")
@@ -134,7 +165,7 @@ def parse_article(url):
                             })
                 parsed_text += (f"[Image {len(links)}: "
                                 + f"{img_attrs['alt']}][{len(links)}]\n")
-        elif el.name == "div" and "twitter-tweet-wrapper" in el.get("class"):
+        elif el.name and extractor.tweet and extractor.tweet.match(el):
             tweet = el.find("a")
             if tweet:
                 links.append({
@@ -148,6 +179,28 @@ def parse_article(url):
     return parsed_text
 
 
+def html_to_text(summaries):
+    """
+    Converts list of HTML strings to list of plain text strings.
+
+    The whole batch is joined into one string so every regular
+    expression runs once per batch instead of once per entry.
+    Block tags become line breaks, other tags are dropped,
+    entities are unescaped and whitespace is collapsed.
+    """
+    text = batch_separator.join(
+        summary.replace(batch_separator, "") for summary in summaries)
+    text = hidden_tag_re.sub("", text)
+    text = block_tag_re.sub("\n", text)
+    text = tag_re.sub("", text)
+    text = html.unescape(text)
+    text = spaces_re.sub(" ", text)
+    text = blank_lines_re.sub("\n", text)
+    texts = [part.strip() for part in text.split(batch_separator)]
+    assert len(texts) == len(summaries)
+    return texts
+
+
 def print_in_frame(*args):
     """
     Gets one or more string params and prints them
@@ -195,8 +248,9 @@ def print_result(parsed_rss):
         if item['links'][1] and item['links'][0]['type'] == 'image':
             print(f"[Image {item['links'][0]['id']}: "
                   + f"{item['title']}][{item['links'][0]['id']}]")
-        if len(item['summary']) > 0:
-            print(item['summary'])
+        summary = item.get('summary_text', item['summary'])
+        if len(summary) > 0:
+            print(summary)
         print()
         print("-"*30)
         if len(item['article_content']) > 0:
@@ -208,25 +262,94 @@ def print_result(parsed_rss):
         print()
         pass
 
-def parse_rss(rss_url, limit):
+def parse_entry(entry):
+    """
+    Parses one feed entry into the item dict.
+
+    Input parameters:
+        entry - feedparser entry to be parsed.
+    """
+    links.clear()
+    summary = ""
+    article_content = ""
+    title = entry['title']
+    date = time.strftime('%a, %-d %b %Y %H:%M:%S %z',
+                         entry['published_parsed'])
+    links.append({
+                "id": len(links) + 1,
+                "src": entry['link'],
+                "type": "link"})
+    link = entry['link']
+    # Summary is HTML, so the title is escaped to survive html_to_text
+    image_title = html.escape(entry['title'], quote=False)
+    if "media_content" in entry \
+            and len(entry['media_content']) > 0 \
+            and entry['media_content'][0] != {}:
+        for media_content in entry['media_content']:
+            links.append({
+                        "id": len(links) + 1,
+                        "src": media_content["url"],
+                        "type": "image"
+                        })
+            summary += (f"[Image {len(links)}: "
+                        + f"{image_title}][{len(links)}]")
+    if "media_thumbnail" in entry \
+            and len(entry['media_thumbnail']) > 0 \
+            and entry['media_thumbnail'][0] != {}:
+        if len(summary) > 0:
+            summary += "\n"
+        for media_thumbnail in entry['media_thumbnail']:
+            links.append({
+                        "id": len(links) + 1,
+                        "src": media_thumbnail["url"],
+                        "type": "image"
+                        })
+            summary += (f"[Image {len(links)}: "
+                        + f"{image_title}][{len(links)}]")
+    if "summary" in entry:
+        summary += f"\n{entry['summary']}"
+    else:
+        summary += "\nNo summary"
+
+    extractor = extractors.get_extractor(link)
+    if extractor is not None:
+        logger.info(f"Parsing article web-page with {extractor.host} extractor")
+        links_count = len(links)
+        try:
+            article_content = parse_article(link, extractor)
+        except (ElementNotFound, ElementAttributeNotFound, RequestException) as e:
+            logger.error(f"Unable to parse article {link}: {e}")
+            del links[links_count:]
+
+    return {
+        "title": title,
+        "date": date,
+        "link": link,
+        "summary": summary,
+        "article_content": article_content,
+        "links": links.copy()
+    }
+
+def parse_rss(rss_url, limit, media_dir=None, media_max_bytes=None,
+              memory_budget=None):
     """
     Reads and parses RSS.
 
     This function reads RSS feed by provided URL, parses it
-    and caches the result
+    and caches the result.
+    If memory budget is given, parsed entries are cached in chunk files
+    and released, so they never take more than a part of the budget.
+    Every chunk is written into its own file, without reading
+    the rest of the cache.
 
     Input parameters:
         rss_url - RSS feed URL to be read.
         limit - The amount of entries to be read from the feed.
+        media_dir - Downloads entries images into this directory if provided.
+        media_max_bytes - Maximum total size of the media directory.
+        memory_budget - Memory budget in bytes for memory-bounded mode.
     """
     feed = {}
-    rss_url_parsed = urlparse(rss_url)
-    if rss_url_parsed.netloc + rss_url_parsed.path == "news.yahoo.com/rss/":
-        parse_article_page = True
-    else:
-        parse_article_page = False
-
-    logger.info(f"Parsing article web-page set to {parse_article_page}")
     parsed_feed = feedparser.parse(rss_url)
     if parsed_feed.bozo > 0:
         raise FeedparserFeedFormattingError(
@@ -240,64 +363,69 @@ def parse_rss(rss_url, limit):
 
     entries = parsed_feed.entries
     limit = limit if limit <= len(entries) else len(entries)
+    del entries[limit:]
+    if memory_budget is not None:
+        chunk_max_bytes = memory_budget // chunk_budget_divider
+    else:
+        chunk_max_bytes = None
+    chunk_bytes = 0
+    append = False
+    if media_dir is not None:
+        if media_max_bytes is None:
+            media_max_bytes = media.default_max_bytes
+        media_store = media.MediaStore(media_dir, media_max_bytes)
+    else:
+        media_store = None
+
     logger.info(f"Start reading {limit} entries from feed")
     for k in range(limit):
         logger.info(f"Entry {k + 1} start")
-        links.clear()
-        summary = ""
-        article_content = ""
-        title = entries[k]['title']
-        date = time.strftime('%a, %-d %b %Y %H:%M:%S %z',
-                             entries[k]['published_parsed'])
-        links.append({
-                    "id": len(links) + 1,
-                    "src": entries[k]['link'],
-                    "type": "link"})
-        link = entries[k]['link']
-        if "media_content" in entries[k] \
-                and len(entries[k]['media_content']) > 0 \
-                and entries[k]['media_content'][0] != {}:
-            for media in entries[k]['media_content']:
-                links.append({
-                            "id": len(links) + 1,
-                            "src": media["url"],
-                            "type": "image"
-                            })
-                summary += (f"[Image {len(links)}: "
-                            + f"{entries[k]['title']}][{len(links)}]")
-        if "media_thumbnail" in entries[k] \
-                and len(entries[k]['media_thumbnail']) > 0 \
-                and entries[k]['media_thumbnail'][0] != {}:
-            if len(summary) > 0:
-                summary += "\n"
-            for media in entries[k]['media_thumbnail']:
-                links.append({
-                            "id": len(links) + 1,
-                            "src": media["url"],
-                            "type": "image"
-                            })
-                summary += (f"[Image {len(links)}: "
-                            + f"{entries[k]['title']}][{len(links)}]")
-        if "summary" in entries[k]:
-            summary += f"\n{entries[k]['summary']}"
-        else:
-            summary += "\nNo summary"
-
-        if parse_article_page:
-            article_content = parse_article(entries[k]['link'])
-
-        feed["items"].append({
-            "title": title,
-            "date": date,
-            "link": link,
-            "summary": summary,
-            "article_content": article_content,
-            "links": links.copy()
-        })
+        item = parse_entry(entries[k])
+        entries[k] = None
+        feed["items"].append(item)
         logger.info(f"Entry {k + 1} end")
-    cache_feed(feed)
-
-def read_rss(rss_url=None, limit=3, to_json=False, verbose=False, date=None):
+        if chunk_max_bytes is not None:
+            chunk_bytes += len(json.dumps(item, ensure_ascii=False))
+            if chunk_bytes >= chunk_max_bytes and k + 1 < limit:
+                logger.info(f"Caching chunk of {len(feed['items'])} entries")
+                process_items(feed["items"], media_store)
+                cache_feed(feed, append)
+                feed["items"].clear()
+                chunk_bytes = 0
+                append = True
+    process_items(feed["items"], media_store)
+    cache_feed(feed, append)
+    if media_store is not None:
+        media_store.save()
+
+def process_items(items, media_store=None):
+    """
+    Adds plain text summaries to parsed items
+    and downloads their media if media store is given.
+    """
+    summaries_text = html_to_text([item["summary"] for item in items])
+    for item, summary_text in zip(items, summaries_text):
+        item["summary_text"] = summary_text
+        item["summary_length"] = len(item["summary"])
+        item["summary_text_length"] = len(summary_text)
+    if media_store is not None:
+        media_store.fetch(items)
+
+def get_peak_rss():
+    """
+    Returns peak resident set size of the process in bytes
+    or None if it is not available on the platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak_rss if platform.system() == "Darwin" else peak_rss * 1024
+
+def read_rss(rss_url=None, limit=3, to_json=False, verbose=False, date=None,
+             media_dir=None, media_max_bytes=None, memory_budget=None):
     """
     Initiates reading and parsing RSS.
 
@@ -310,16 +438,21 @@ def read_rss(rss_url=None, limit=3, to_json=False, verbose=False, date=None):
         limit - The amount of entries to be read from the feed.
         to_json - JSON output flag. Prints JSON if 'True'.
         verbose - Prints additional information if 'True'.
+        date - Cache date (YYYYMMDD) to get the feed for.
+        media_dir - Downloads entries images into this directory if provided.
+        media_max_bytes - Maximum total size of the media directory.
+        memory_budget - Memory budget in bytes for memory-bounded mode.
     """
     if verbose:
         logger.setLevel(logging.INFO)
     else:
         logger.setLevel(logging.ERROR)
     logger.info("Start reading")
+    migrate_legacy_cache()
 
     if date is None:
         logger.info(f"Parsing RSS")
-        parse_rss(rss_url, limit)
+        parse_rss(rss_url, limit, media_dir, media_max_bytes, memory_budget)
 
     feed = get_cached_feed(date, rss_url, limit)
 
@@ -331,39 +464,206 @@ def read_rss(rss_url=None, limit=3, to_json=False, verbose=False, date=None):
         for item in feed["feed"]:
             print_result(item)
 
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        logger.info(f"Peak RSS: {peak_rss / 1024 / 1024:.1f} MB")
+        if memory_budget is not None and peak_rss > memory_budget:
+            logger.error(f"Peak RSS {peak_rss / 1024 / 1024:.1f} MB "
+                         + f"exceeded memory budget of "
+                         + f"{memory_budget / 1024 / 1024:.1f} MB")
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def write_json(path, data):
+    """
+    Writes JSON file atomically, so readers never see partial file.
+    """
+    fd, part_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(part_path, path)
+
+def is_cache_date(value):
+    """
+    Checks that the value is a cache date in YYYYMMDD form,
+    so it is safe to be used as a cache directory name.
+    """
+    return len(value) == 8 and value.isdigit()
+
+def check_cache_date(date):
+    if not is_cache_date(date):
+        raise InvalidCacheDate(f"Invalid cache date '{date}', expected YYYYMMDD")
+
+def get_feed_dir(date, feed_url):
+    """
+    Returns cache directory of the feed for the date.
+
+    Cache layout is 'cache_dir/YYYYMMDD/<sha1 of feed URL>/' with
+    'feed.json' holding feed title and URL, and numbered chunk files
+    ('000000.json', ...) holding lists of feed items.
+    """
+    check_cache_date(date)
+    key = hashlib.sha1(feed_url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, date, key)
+
+def get_cached_dates(date_from=None, date_to=None):
+    """
+    Returns sorted list of cached dates (YYYYMMDD) within given range.
+    """
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names
+                  if is_cache_date(name)
+                  and (date_from is None or name >= date_from)
+                  and (date_to is None or name <= date_to))
+
+def get_cached_feed_dirs(date, feed_url=None):
+    """
+    Returns cache directories of the feeds cached for the date
+    in the order they were cached.
+    Feeds replaced by a concurrent writer meanwhile are skipped.
+    """
+    check_cache_date(date)
+    if feed_url is not None:
+        feed_dirs = [get_feed_dir(date, feed_url)]
+    else:
+        day_dir = os.path.join(cache_dir, date)
+        try:
+            names = os.listdir(day_dir)
+        except FileNotFoundError:
+            return []
+        feed_dirs = [os.path.join(day_dir, name) for name in names
+                     if not name.endswith(part_suffix)]
+    cached_at = {}
+    for feed_dir in feed_dirs:
+        try:
+            cached_at[feed_dir] = os.stat(
+                os.path.join(feed_dir, feed_file_name)).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return sorted(cached_at, key=cached_at.get)
+
+def get_chunk_names(feed_dir):
+    return sorted(name for name in os.listdir(feed_dir)
+                  if name != feed_file_name and name.endswith(".json"))
+
+def iter_cached_chunks(feed_dir, limit=None):
+    """
+    Yields cached items of the feed chunk by chunk.
+    Stops reading chunk files once 'limit' items are yielded.
+    Raises FileNotFoundError if the feed is replaced meanwhile.
+    """
+    names = get_chunk_names(feed_dir)
+    if not names:
+        # every cached feed has a chunk, so its directory was just removed
+        raise FileNotFoundError(f"No chunk files in {feed_dir}")
+    count = 0
+    for name in names:
+        if limit is not None and count >= limit:
+            return
+        items = read_json(os.path.join(feed_dir, name))
+        if limit is not None:
+            items = items[:limit - count]
+        count += len(items)
+        yield items
+
 def get_cached_feed(date, feed_url, limit):
+    """
+    Gets cached feeds for the date.
+
+    Only chunk files holding first 'limit' items
+    of every cached feed are read.
+
+    Input parameters:
+        date - Cache date (YYYYMMDD), today if None.
+        feed_url - Only this feed is returned if provided.
+        limit - The amount of entries to be returned for every feed.
+    """
     if date is None:
         date = time.strftime("%Y%m%d")
-    with TinyDB(db_path) as db:
-        if feed_url is None:
-            query = (Query().cache_date == date)
-        else:
-            query = ((Query().cache_date == date) &
-                (Query().feed_url == feed_url))
-
-        cached_feed = db.search(query)
-        feed_content = []
-        for item in cached_feed:
-                if len(item["feed_content"]["items"]) > limit:
-                    item["feed_content"]["items"] = item["feed_content"]["items"][:limit]
-                feed_content.append(item["feed_content"])
-        return {"date": date, "feed": feed_content}
-
-def cache_feed(data):
-    with TinyDB(db_path) as db:
+    feed_content = []
+    for feed_dir in get_cached_feed_dirs(date, feed_url):
+        # feed replaced by a concurrent writer is read again
+        for attempt in range(cache_read_attempts):
+            try:
+                content = read_json(os.path.join(feed_dir, feed_file_name))
+                content["items"] = [
+                    item for items in iter_cached_chunks(feed_dir, limit)
+                    for item in items]
+            except FileNotFoundError:
+                continue
+            feed_content.append(content)
+            break
+    return {"date": date, "feed": feed_content}
+
+def cache_feed(data, append=False, date=None):
+    """
+    Caches parsed feed items as a new chunk file.
+
+    Replaced feed is written into a sibling directory first
+    and renamed into place, so readers never see it half written.
+
+    Input parameters:
+        data - Parsed feed.
+        append - Adds feed items to already cached feed
+            instead of replacing it if 'True'.
+        date - Cache date (YYYYMMDD), today if None.
+    """
+    if date is None:
         date = time.strftime("%Y%m%d")
-        feed_cache_content = {
-                "cache_date": date,
-                "feed_url": data["url"],
-                "feed_content": data
-                }
-        if not db.contains((Query().cache_date == date) &
-                (Query().feed_url == data["url"])):
-            db.insert(feed_cache_content)
-        else:
-            db.update(feed_cache_content,
-                ((Query().cache_date == date) &
-                    (Query().feed_url == data["url"])))
+    feed_dir = get_feed_dir(date, data["url"])
+    if append and os.path.exists(os.path.join(feed_dir, feed_file_name)):
+        chunk_name = f"{len(get_chunk_names(feed_dir)):06d}.json"
+        write_json(os.path.join(feed_dir, chunk_name), data["items"])
+        return
+    day_dir = os.path.dirname(feed_dir)
+    os.makedirs(day_dir, exist_ok=True)
+    new_dir = tempfile.mkdtemp(dir=day_dir, suffix=part_suffix)
+    write_json(os.path.join(new_dir, feed_file_name),
+               {"feed": data["feed"], "url": data["url"]})
+    write_json(os.path.join(new_dir, f"{0:06d}.json"), data["items"])
+    old_dir = new_dir[:-len(part_suffix)] + ".old" + part_suffix
+    try:
+        os.rename(feed_dir, old_dir)
+    except FileNotFoundError:
+        old_dir = None
+    os.rename(new_dir, feed_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+def migrate_legacy_cache():
+    """
+    Moves feeds of the legacy single-file TinyDB cache into cache_dir.
+
+    Feeds already cached in cache_dir for the same date are kept.
+    Legacy file is renamed to '.migrated' afterwards, so it is
+    read only once. Unreadable legacy file is logged and left as is.
+    """
+    try:
+        with open(legacy_db_path, "r", encoding="utf-8") as file:
+            legacy_db = json.load(file)
+        documents = list(legacy_db["_default"].values())
+    except FileNotFoundError:
+        return
+    except (ValueError, OSError, KeyError, TypeError, AttributeError) as e:
+        logger.error(f"Unable to migrate legacy cache {legacy_db_path}: {e}")
+        return
+    logger.info(f"Migrating {len(documents)} feeds from legacy cache "
+                + f"{legacy_db_path} into {cache_dir}")
+    for document in documents:
+        date = document["cache_date"]
+        content = document["feed_content"]
+        if not is_cache_date(date) or os.path.exists(
+                os.path.join(get_feed_dir(date, content["url"]), feed_file_name)):
+            continue
+        if content["items"] and "summary_text" not in content["items"][0]:
+            process_items(content["items"])
+        cache_feed(content, date=date)
+    os.replace(legacy_db_path, legacy_db_path + ".migrated")
 
 sys.excepthook = exception_handler
 
@@ -0,0 +1,269 @@
+"""
+Serves cached feeds over HTTP.
+
+Runs local HTTP server that answers the same queries as
+'--date' option does (by date, feed, limit and search string)
+with JSON responses. Recently requested days are kept in memory
+and dropped as soon as that day's cache changes. Responses carry
+ETag header and '304 Not Modified' is returned for known ones.
+
+Endpoints:
+
+    GET /feed?date=YYYYMMDD&url=FEED_URL&limit=N&search=TEXT
+
+Usage:
+
+    serve(host="localhost", port=8080)
+
+"""
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from rss_reader import one_shot
+from rss_reader.one_shot import logger
+
+
+default_address = "localhost:8080"
+
+
+class InvalidQueryParameter(Exception):
+    pass
+
+class InvalidServerAddress(Exception):
+    pass
+
+
+def parse_address(address):
+    """
+    Splits 'HOST:PORT' or 'PORT' string into (host, port) tuple.
+    """
+    host, _, port = address.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise InvalidServerAddress(f"Invalid server address '{address}'")
+    if not 0 <= port <= 65535:
+        raise InvalidServerAddress(
+            f"Server port {port} is out of range 0-65535")
+    return host or "localhost", port
+
+
+def item_matches(item, search):
+    """
+    Checks if lowercased search string is in item title or summary.
+    """
+    return (search in item["title"].lower()
+            or search in item.get("summary_text", item["summary"]).lower())
+
+
+def get_day_signature(date):
+    """
+    Returns signature of the cached day which changes on every
+    write into it, or None if nothing is cached for the date.
+    Made of feed directories names, modification times and
+    number of files, so no cache file is read.
+    """
+    day_dir = os.path.join(one_shot.cache_dir, date)
+    try:
+        names = sorted(os.listdir(day_dir))
+    except FileNotFoundError:
+        return None
+    signature = []
+    for name in names:
+        if name.endswith(one_shot.part_suffix):
+            continue
+        feed_dir = os.path.join(day_dir, name)
+        try:
+            signature.append((name, os.stat(feed_dir).st_mtime_ns,
+                              len(os.listdir(feed_dir))))
+        except FileNotFoundError:
+            continue
+    return tuple(signature)
+
+
+class CacheIndex:
+    """
+    In-memory index of cached feeds grouped by cache date.
+
+    Keeps at most 'max_days' recently requested days and
+    'max_responses' rendered responses. Day and its responses
+    are dropped when the day signature changes.
+    Shared lock guards only the dicts, cache files are read
+    and responses are rendered outside of it. A day is loaded
+    under its own lock, so concurrent misses read it once.
+    """
+    def __init__(self, max_days=7, max_responses=1024):
+        self.max_days = max_days
+        self.max_responses = max_responses
+        self.days = OrderedDict()
+        self.day_locks = {}
+        self.responses = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_cached_day(self, date, signature):
+        with self.lock:
+            cached = self.days.get(date)
+            if cached is not None and cached[0] == signature:
+                self.days.move_to_end(date)
+                return cached[1]
+        return None
+
+    def get_day(self, date, signature):
+        """
+        Returns cached feeds for the date, reading cache files if needed.
+        """
+        cached_feed = self.get_cached_day(date, signature)
+        if cached_feed is not None:
+            return cached_feed
+        with self.lock:
+            day_lock = self.day_locks.setdefault(date, threading.Lock())
+        with day_lock:
+            cached_feed = self.get_cached_day(date, signature)
+            if cached_feed is not None:
+                return cached_feed
+            logger.info(f"Loading cache for {date} into in-memory index")
+            if signature is None:
+                cached_feed = []
+            else:
+                cached_feed = one_shot.get_cached_feed(date, None, None)["feed"]
+            with self.lock:
+                self.days[date] = (signature, cached_feed)
+                self.days.move_to_end(date)
+                if len(self.days) > self.max_days:
+                    evicted, _ = self.days.popitem(last=False)
+                    self.day_locks.pop(evicted, None)
+        return cached_feed
+
+    def query(self, date, signature, feed_url=None, limit=None, search=None):
+        """
+        Returns cached feed in the same form as 'get_cached_feed' does.
+        """
+        feed_content = []
+        for content in self.get_day(date, signature):
+            if feed_url is not None and content["url"] != feed_url:
+                continue
+            items = content["items"]
+            if search:
+                items = [item for item in items
+                         if item_matches(item, search.lower())]
+            if limit is not None:
+                items = items[:limit]
+            feed_content.append(dict(content, items=items))
+        return {"date": date, "feed": feed_content}
+
+    def response(self, date, feed_url=None, limit=None, search=None):
+        """
+        Returns (body, etag) tuple of rendered JSON response.
+        """
+        key = (date, feed_url, limit, search)
+        signature = get_day_signature(date)
+        with self.lock:
+            cached = self.responses.get(key)
+            if cached is not None and cached[0] == signature:
+                self.responses.move_to_end(key)
+                return cached[1], cached[2]
+        feed = self.query(date, signature, feed_url, limit, search)
+        body = json.dumps(feed, ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with self.lock:
+            self.responses[key] = (signature, body, etag)
+            self.responses.move_to_end(key)
+            if len(self.responses) > self.max_responses:
+                self.responses.popitem(last=False)
+        return body, etag
+
+
+def parse_feed_query(query_string):
+    """
+    Parses '/feed' query string into 'CacheIndex.response' arguments.
+    """
+    params = parse_qs(query_string)
+    date = params.get("date", [time.strftime("%Y%m%d")])[0]
+    if not one_shot.is_cache_date(date):
+        raise InvalidQueryParameter(
+            f"Invalid date value '{date}', expected YYYYMMDD")
+    feed_url = params.get("url", [None])[0]
+    search = params.get("search", [None])[0]
+    limit = params.get("limit", [None])[0]
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidQueryParameter(f"Invalid limit value '{limit}'")
+        if limit < 0:
+            raise InvalidQueryParameter(f"Invalid limit value '{limit}'")
+    return date, feed_url, limit, search
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    index = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/feed":
+            self.send_json_error(404, "Not found")
+            return
+        try:
+            body, etag = self.index.response(*parse_feed_query(url.query))
+        except InvalidQueryParameter as e:
+            self.send_json_error(400, str(e))
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_error(self, code, message):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def make_server(host="localhost", port=8080, index=None):
+    """
+    Creates HTTP server bound to the given address.
+    """
+    handler = type("Handler", (CacheRequestHandler,),
+                   {"index": index or CacheIndex()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(address=default_address, verbose=False):
+    """
+    Serves cached feeds on the given 'HOST:PORT' address until interrupted.
+
+    Input parameters:
+        address - 'HOST:PORT' or 'PORT' to listen on.
+        verbose - Prints additional information if 'True'.
+    """
+    if verbose:
+        logger.setLevel(logging.INFO)
+    else:
+        logger.setLevel(logging.ERROR)
+    host, port = parse_address(address)
+    one_shot.migrate_legacy_cache()
+    with make_server(host, port) as server:
+        logger.info(f"Serving cached feeds on http://{host}:{port}/feed")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,109 @@
+import csv
+import gzip
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from rss_reader import export
+from rss_reader import one_shot
+from tests.fixtures import parsed_feed
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+tempdir = "/tmp" if platform.system() == "Darwin" else tempfile.gettempdir()
+cache_dir = os.path.join(tempdir, "test_cache")
+legacy_db_path = os.path.join(tempdir, "test_cache.json")
+export_path = os.path.join(tempdir, "test_export")
+
+class TestExportCache(unittest.TestCase):
+    def setUp(self):
+        self.feed = json.loads(parsed_feed.parsed_feed, strict=False)
+        with patch('rss_reader.one_shot.cache_dir', cache_dir):
+            one_shot.cache_feed(self.feed, date="20220919")
+            one_shot.cache_feed(dict(self.feed, url="http://www.example.com"),
+                                date="20220920")
+
+    def tearDown(self):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if os.path.exists(export_path):
+            os.remove(export_path)
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_export_jsonl(self):
+        count = export.export_cache(export_path, "jsonl")
+        with gzip.open(export_path, "rt", encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+
+        self.assertEqual(count, 2)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["cache_date"], "20220919")
+        self.assertEqual(rows[0]["feed_url"], self.feed["url"])
+        self.assertEqual(rows[0]["title"], self.feed["items"][0]["title"])
+        self.assertListEqual(rows[0]["links"], self.feed["items"][0]["links"])
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_export_csv(self):
+        count = export.export_cache(export_path, "csv")
+        with open(export_path, "r", encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+
+        self.assertEqual(count, 2)
+        self.assertListEqual(list(rows[0].keys()), export.columns)
+        self.assertEqual(rows[1]["summary"], self.feed["items"][0]["summary"])
+        self.assertListEqual(json.loads(rows[1]["links"]),
+                             self.feed["items"][0]["links"])
+
+    @unittest.skipUnless(pq, "pyarrow is not installed")
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_export_parquet(self):
+        count = export.export_cache(export_path, "parquet")
+        rows = pq.read_table(export_path).to_pylist()
+
+        self.assertEqual(count, 2)
+        self.assertListEqual(list(rows[0].keys()), export.columns)
+        self.assertEqual(rows[0]["cache_date"], "20220919")
+        self.assertEqual(rows[1]["feed_url"], "http://www.example.com")
+        self.assertEqual(rows[0]["title"], self.feed["items"][0]["title"])
+        self.assertListEqual(json.loads(rows[0]["links"]),
+                             self.feed["items"][0]["links"])
+
+    @patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None})
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_raise_on_missing_pyarrow(self):
+        with self.assertRaises(export.ExportFormatNotSupported):
+            export.export_cache(export_path, "parquet")
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    def test_should_filter_by_date_and_feed(self):
+        rows = list(export.iter_cached_entries(date_from="20220920"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["cache_date"], "20220920")
+
+        rows = list(export.iter_cached_entries(date_to="20220919"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["cache_date"], "20220919")
+
+        rows = list(export.iter_cached_entries(feed_url="http://www.example.com"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["feed_url"], "http://www.example.com")
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_raise_on_unknown_format(self):
+        with self.assertRaises(export.ExportFormatNotSupported):
+            export.export_cache(export_path, "xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import feedparser
+from unittest.mock import patch, Mock
+from rss_reader import extractors
+from rss_reader import one_shot
+from tests.fixtures import article_parser
+
+class TestGetExtractor(unittest.TestCase):
+    def test_should_return_registered_extractor(self):
+        self.assertIs(
+            extractors.get_extractor("https://news.yahoo.com/some-article.html"),
+            extractors.yahoo)
+        self.assertIs(
+            extractors.get_extractor("https://NEWS.yahoo.com/some-article.html"),
+            extractors.yahoo)
+
+    @patch('rss_reader.extractors._entry_points', {})
+    def test_should_return_none_for_unknown_host(self):
+        self.assertIsNone(
+            extractors.get_extractor("https://www.example.com/article.html"))
+
+    @patch('rss_reader.extractors.registry', {})
+    def test_should_load_extractor_from_entry_point(self):
+        entry_point = Mock()
+        entry_point.load.return_value = {
+            "title": "h1.title",
+            "body": "div.content",
+        }
+        with patch('rss_reader.extractors._entry_points',
+                   {"www.example.com": entry_point}):
+            extractor = extractors.get_extractor("https://www.example.com/1")
+            self.assertIs(extractors.get_extractor("https://www.example.com/2"),
+                          extractor)
+
+        entry_point.load.assert_called_once()
+        self.assertEqual(extractor.host, "www.example.com")
+        self.assertIsNone(extractor.cover)
+        self.assertIsNone(extractor.tweet)
+
+    def test_should_raise_on_incomplete_spec(self):
+        with self.assertRaises(extractors.ExtractorSpecError):
+            extractors.Extractor("www.example.com", {"title": "h1"})
+
+    def test_should_raise_on_invalid_selector(self):
+        with self.assertRaises(extractors.ExtractorSpecError):
+            extractors.Extractor("www.example.com",
+                                 {"title": "h1[", "body": "div"})
+
+    @patch('rss_reader.extractors.registry', {})
+    def test_should_log_broken_entry_point_once(self):
+        broken = [Mock(), Mock(), Mock()]
+        broken[0].load.side_effect = ImportError("No module named 'plugin'")
+        broken[1].load.return_value = {"title": "h1"}
+        broken[2].load.return_value = {"title": "h1[", "body": "div"}
+        hosts = ["a.example.com", "b.example.com", "c.example.com"]
+        with patch('rss_reader.extractors._entry_points', dict(zip(hosts, broken))):
+            with self.assertLogs(extractors.logger, level='ERROR') as logs:
+                for host in hosts:
+                    self.assertIsNone(extractors.get_extractor(f"https://{host}/1"))
+                    self.assertIsNone(extractors.get_extractor(f"https://{host}/2"))
+
+        self.assertEqual(len(logs.output), 3)
+        self.assertRegex(logs.output[0], r"a.example.com.*ImportError")
+        self.assertRegex(logs.output[2], r"c.example.com.*ExtractorSpecError")
+        for entry_point in broken:
+            entry_point.load.assert_called_once()
+
+class TestParseArticleWithExtractor(unittest.TestCase):
+    @patch('rss_reader.one_shot.links', [])
+    @patch('rss_reader.one_shot.get', Mock())
+    def test_should_use_extractor_selectors(self):
+        one_shot.get("www.example.com").content = (
+            '<html><body><h1 class="title">Article header</h1>'
+            + '<div class="content"><figure>'
+            + '<img alt="Image description" src="https://www.example.com/1.png" />'
+            + '</figure><p>Some text here</p></div></body></html>')
+        extractor = extractors.Extractor("www.example.com", {
+            "title": "h1.title",
+            "body": "div.content",
+        })
+        parsed_article = one_shot.parse_article("www.example.com", extractor)
+
+        self.assertDictEqual(one_shot.links[0],
+            {'id': 1, 'src': 'https://www.example.com/1.png', 'type': 'image'})
+        self.assertRegex(parsed_article, r"Article header")
+        self.assertRegex(parsed_article, r"Some text here")
+
+    @patch('rss_reader.one_shot.links', [])
+    @patch('rss_reader.one_shot.get', Mock())
+    def test_should_name_selector_in_error(self):
+        one_shot.get("www.example.com").content = article_parser.article_web_page_no_title
+
+        with self.assertRaisesRegex(one_shot.ElementNotFound,
+                                    r"'header.caas-title-wrapper'.*news.yahoo.com"):
+            one_shot.parse_article("www.example.com")
+
+    @patch('rss_reader.one_shot.links', [])
+    @patch('rss_reader.one_shot.get', Mock())
+    @patch('rss_reader.one_shot.cache_feed')
+    @patch('rss_reader.one_shot.feedparser')
+    def test_should_keep_entry_on_extractor_failure(self, mocked_parser,
+                                                    mocked_cache):
+        with open("tests/fixtures/feed.xml", "r") as file:
+            mocked_parser.parse.return_value = feedparser.parse(file.read())
+        one_shot.get("www.example.com").content = article_parser.article_web_page_no_body
+
+        with patch.dict('rss_reader.extractors.registry',
+                        {"www.newyorker.com": extractors.yahoo}):
+            with self.assertLogs(one_shot.logger, level='ERROR') as logs:
+                one_shot.parse_rss('http://www.example.com', 2)
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertRegex(logs.output[0], r"'div.caas-body'")
+        items = mocked_cache.call_args[0][0]["items"]
+        self.assertEqual(len(items), 2)
+        self.assertEqual(items[0]["article_content"], "")
+        self.assertRegex(items[0]["summary"], r"The former President")
+        self.assertListEqual([link["type"] for link in items[0]["links"]],
+                             ["link", "image"])
+
+
+if __name__ == '__main__':
+    unittest.main()
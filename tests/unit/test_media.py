@@ -0,0 +1,197 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import feedparser
+from requests import RequestException
+from rss_reader import media
+from rss_reader import one_shot
+
+contents = {
+    "https://www.example.com/1.png": b"first image",
+    "https://www.example.com/2.png": b"second image",
+    "https://www.example.com/copy.png": b"first image",
+}
+
+feed_with_media = """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>Feed</title><link>https://www.example.com/</link>
+<item><title>Entry</title><link>https://www.example.com/entry</link>
+<pubDate>Tue, 20 Sep 2022 10:54:48 +0000</pubDate>
+<description>Summary</description>
+<media:content url="https://www.example.com/1.png"/>
+<media:thumbnail url="https://www.example.com/2.png"/>
+</item></channel></rss>"""
+
+def mocked_get(url, stream=False, timeout=None, content_length=True):
+    if url not in contents:
+        raise RequestException(f"404 for {url}")
+    content = contents[url]
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.headers = {"Content-Type": "image/png"}
+    if content_length:
+        response.headers["Content-Length"] = str(len(content))
+    response.iter_content.side_effect = lambda size: (
+        content[k:k + 4] for k in range(0, len(content), 4))
+    return response
+
+def make_items(*urls):
+    return [{"links": [{"id": 1, "src": "https://www.example.com/", "type": "link"}]
+                      + [{"id": k + 2, "src": url, "type": "image"}
+                         for k, url in enumerate(urls)]}]
+
+class TestFetchMedia(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_store_media_by_content_hash(self, mocked):
+        items = make_items(*contents)
+        written = media.fetch_media(items, self.store_dir)
+        links = items[0]["links"]
+
+        self.assertEqual(written, len(b"first image") + len(b"second image"))
+        self.assertNotIn("local_path", links[0])
+        self.assertEqual(links[1]["local_path"], links[3]["local_path"])
+        self.assertNotEqual(links[1]["local_path"], links[2]["local_path"])
+        self.assertTrue(links[1]["local_path"].endswith(".png"))
+        with open(links[2]["local_path"], "rb") as file:
+            self.assertEqual(file.read(), b"second image")
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_skip_already_fetched_urls(self, mocked):
+        media.fetch_media(make_items("https://www.example.com/1.png"),
+                          self.store_dir)
+        items = make_items("https://www.example.com/1.png")
+        self.assertEqual(media.fetch_media(items, self.store_dir), 0)
+        self.assertEqual(mocked.call_count, 1)
+        self.assertIn("local_path", items[0]["links"][1])
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_respect_store_size_limit(self, mocked):
+        items = make_items("https://www.example.com/1.png",
+                           "https://www.example.com/2.png")
+        written = media.fetch_media(items, self.store_dir,
+                                    max_bytes=len(b"second image"))
+        stored = [link for link in items[0]["links"] if "local_path" in link]
+
+        self.assertEqual(len(stored), 1)
+        self.assertLessEqual(written, len(b"second image"))
+        self.assertEqual(media.get_store_size(self.store_dir), written)
+
+    @patch('rss_reader.media.get',
+           side_effect=lambda url, **kwargs: mocked_get(url, content_length=False))
+    def test_should_stop_streaming_over_size_limit(self, mocked):
+        items = make_items("https://www.example.com/1.png")
+        written = media.fetch_media(items, self.store_dir, max_bytes=5)
+
+        self.assertEqual(written, 0)
+        self.assertNotIn("local_path", items[0]["links"][1])
+        self.assertListEqual([name for name in os.listdir(self.store_dir)
+                              if name != media.index_file_name], [])
+
+    def test_should_skip_by_content_length(self):
+        response = mocked_get("https://www.example.com/1.png")
+        items = make_items("https://www.example.com/1.png")
+        with patch('rss_reader.media.get', return_value=response):
+            self.assertEqual(
+                media.fetch_media(items, self.store_dir, max_bytes=10), 0)
+        response.iter_content.assert_not_called()
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_treat_broken_index_as_empty(self, mocked):
+        with open(os.path.join(self.store_dir, media.index_file_name), "w") as file:
+            file.write('{"a": ')
+        items = make_items("https://www.example.com/1.png")
+        with self.assertLogs(media.logger, level='ERROR'):
+            media.fetch_media(items, self.store_dir)
+
+        self.assertIn("local_path", items[0]["links"][1])
+        self.assertDictEqual(media.load_index(self.store_dir),
+            {"https://www.example.com/1.png": items[0]["links"][1]["local_path"]})
+        self.assertFalse(any(name.endswith(".part")
+                             for name in os.listdir(self.store_dir)))
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_read_store_once_for_many_chunks(self, mocked):
+        with patch('rss_reader.media.get_store_size',
+                   wraps=media.get_store_size) as mocked_size, \
+                patch('rss_reader.media.save_index',
+                      wraps=media.save_index) as mocked_save:
+            store = media.MediaStore(self.store_dir)
+            for url in contents:
+                store.fetch(make_items(url))
+            store.save()
+
+        self.assertEqual(mocked_size.call_count, 1)
+        self.assertEqual(mocked_save.call_count, 1)
+        self.assertEqual(len(media.load_index(self.store_dir)), 3)
+        self.assertEqual(store.budget.size, media.get_store_size(self.store_dir))
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    def test_should_skip_failed_downloads(self, mocked):
+        items = make_items("https://www.example.com/missing.png")
+        with self.assertLogs(media.logger, level='ERROR'):
+            media.fetch_media(items, self.store_dir)
+        self.assertNotIn("local_path", items[0]["links"][1])
+
+class TestParseRssFetchMedia(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    @patch('rss_reader.one_shot.cache_feed')
+    @patch('rss_reader.one_shot.feedparser')
+    def test_should_fetch_media_of_parsed_entries(self, mocked_parser,
+                                                  mocked_cache, mocked_get):
+        mocked_parser.parse.return_value = feedparser.parse(feed_with_media)
+        one_shot.parse_rss('https://www.example.com/', 1,
+                           media_dir=self.store_dir)
+
+        links = mocked_cache.call_args[0][0]["items"][0]["links"]
+        self.assertListEqual([link["type"] for link in links],
+                             ["link", "image", "image"])
+        self.assertNotIn("local_path", links[0])
+        for link in links[1:]:
+            with open(link["local_path"], "rb") as file:
+                self.assertEqual(file.read(), contents[link["src"]])
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    @patch('rss_reader.one_shot.cache_feed')
+    @patch('rss_reader.one_shot.feedparser')
+    def test_should_walk_store_once_per_run(self, mocked_parser,
+                                            mocked_cache, mocked_get):
+        mocked_parser.parse.return_value = feedparser.parse(
+            feed_with_media.replace("</item>", "</item>" + feed_with_media[
+                feed_with_media.index("<item>"):feed_with_media.index("</item>") + 7]))
+        with patch('rss_reader.media.get_store_size',
+                   wraps=media.get_store_size) as mocked_size:
+            one_shot.parse_rss('https://www.example.com/', 2,
+                               media_dir=self.store_dir, memory_budget=1)
+
+        self.assertEqual(mocked_cache.call_count, 2)
+        self.assertEqual(mocked_size.call_count, 1)
+
+    @patch('rss_reader.media.get', side_effect=mocked_get)
+    @patch('rss_reader.one_shot.cache_feed')
+    @patch('rss_reader.one_shot.feedparser')
+    def test_should_respect_zero_size_limit(self, mocked_parser,
+                                            mocked_cache, mocked_get):
+        mocked_parser.parse.return_value = feedparser.parse(feed_with_media)
+        one_shot.parse_rss('https://www.example.com/', 1,
+                           media_dir=self.store_dir, media_max_bytes=0)
+
+        links = mocked_cache.call_args[0][0]["items"][0]["links"]
+        self.assertFalse(any("local_path" in link for link in links))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 from hashlib import new
 import json
 import tempfile
+import threading
+import time
 import unittest
 from io import StringIO
 from unittest.mock import patch, Mock
@@ -10,12 +12,13 @@ from rss_reader import one_shot
 import feedparser
 from tests.fixtures import article_parser
 from tests.fixtures import parsed_feed
-from tinydb import TinyDB
 import platform
+import shutil
 import tempfile
 
 tempdir = "/tmp" if platform.system() == "Darwin" else tempfile.gettempdir()
-db_path = os.path.join(tempdir, "test_cache.json")
+cache_dir = os.path.join(tempdir, "test_cache")
+legacy_db_path = os.path.join(tempdir, "test_cache.json")
 
 def handle_exceptions_with(excepthook, target, /, *args, **kwargs):
     try:
@@ -129,6 +132,49 @@ class TestParseArticle(unittest.TestCase):
         with self.assertRaises(one_shot.ElementNotFound):
             parsed_article = one_shot.parse_article("www.example.com")
 
+class TestHtmlToText(unittest.TestCase):
+    def test_should_convert_batch_to_text(self):
+        summaries = [
+            "<p>Some&nbsp;<em>text</em></p><p>Tom &amp; Jerry</p>",
+            "[Image 2: Title][2]\n<div>Line 1<br/>Line 2</div>",
+            "<script>alert(1)</script>No summary",
+            "",
+        ]
+        self.assertListEqual(one_shot.html_to_text(summaries), [
+            "Some text\nTom & Jerry",
+            "[Image 2: Title][2]\nLine 1\nLine 2",
+            "No summary",
+            "",
+        ])
+
+    def test_should_not_mix_batch_entries(self):
+        self.assertListEqual(one_shot.html_to_text(["a < b", "<p>x</p>", "c"]),
+                             ["a < b", "x", "c"])
+        self.assertListEqual(
+            one_shot.html_to_text(["<script>x", "a", "<script>y</script>", "z"]),
+            ["x", "a", "", "z"])
+
+    def test_should_keep_image_titles(self):
+        self.assertListEqual(one_shot.html_to_text([
+            "[Image 2: Is 2 < 3 or 5 > 4?][2]\n<p>ok</p>",
+            "[Image 2: &lt;b&gt;Bold&lt;/b&gt; claims][2]\n<p>ok</p>",
+        ]), [
+            "[Image 2: Is 2 < 3 or 5 > 4?][2]\nok",
+            "[Image 2: <b>Bold</b> claims][2]\nok",
+        ])
+
+    def test_should_escape_image_title_in_summary(self):
+        entry = {
+            "title": "<b>Bold</b> claims",
+            "link": "https://example.com/article",
+            "published_parsed": time.gmtime(0),
+            "media_content": [{"url": "https://example.com/image.jpg"}],
+            "summary": "<p>ok</p>",
+        }
+        item = one_shot.parse_entry(entry)
+        self.assertListEqual(one_shot.html_to_text([item["summary"]]),
+                             ["[Image 2: <b>Bold</b> claims][2]\nok"])
+
 class TestPrintInFrame(unittest.TestCase):
     @patch("sys.stdout", new_callable=StringIO)
     def test_should_print_framed_args(self, mocked_stdout):
@@ -164,10 +210,10 @@ class TestReadRss(unittest.TestCase):
             self.parsed_invalid_feed = feedparser.parse(file.read())
 
     def tearDown(self):
-        with TinyDB(db_path) as db:
-            db.drop_tables()
+        shutil.rmtree(cache_dir, ignore_errors=True)
 
-    @patch('rss_reader.one_shot.db_path', db_path)
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
     @patch("sys.stdout", new_callable=StringIO)
     @patch("rss_reader.one_shot.feedparser")
     def test_should_print_proper_result(self, mocked_parser, mocked_stdout):
@@ -178,7 +224,111 @@ class TestReadRss(unittest.TestCase):
         self.assertDictEqual(result["feed"][0], self.expected_json)
         self.assertEqual(len(result["feed"][0]["items"]), 1)
 
-    @patch('rss_reader.one_shot.db_path', db_path)
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch("rss_reader.one_shot.feedparser")
+    def test_should_cache_in_chunks_with_memory_budget(self, mocked_parser):
+        mocked_parser.parse.return_value = self.parsed_feed
+        with patch('rss_reader.one_shot.cache_feed',
+                   wraps=one_shot.cache_feed) as mocked_cache:
+            one_shot.parse_rss('http://www.example.com', 5, memory_budget=1)
+        self.assertEqual(mocked_cache.call_count, 5)
+
+        feed = one_shot.get_cached_feed(None, 'http://www.example.com', 10)
+        items = feed["feed"][0]["items"]
+        self.assertEqual(len(items), 5)
+        self.assertDictEqual(items[0], self.expected_json["items"][0] | {
+            "date": items[0]["date"]})
+        self.assertEqual(len(set(item["link"] for item in items)), 5)
+
+        feed_dir = one_shot.get_feed_dir(time.strftime("%Y%m%d"),
+                                         'http://www.example.com')
+        self.assertEqual(len(one_shot.get_chunk_names(feed_dir)), 5)
+        with patch('rss_reader.one_shot.read_json',
+                   wraps=one_shot.read_json) as mocked_read:
+            feed = one_shot.get_cached_feed(None, 'http://www.example.com', 2)
+        self.assertEqual(len(feed["feed"][0]["items"]), 2)
+        # feed.json and only two one-item chunk files are read
+        self.assertEqual(mocked_read.call_count, 3)
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    def test_should_replace_cached_feed(self):
+        feed = json.loads(parsed_feed.parsed_feed, strict=False)
+        one_shot.cache_feed(feed, date="20220919")
+        one_shot.cache_feed(feed, append=True, date="20220919")
+        cached = one_shot.get_cached_feed("20220919", None, 10)
+        self.assertEqual(len(cached["feed"][0]["items"]), 2)
+
+        one_shot.cache_feed(feed, date="20220919")
+        cached = one_shot.get_cached_feed("20220919", feed["url"], 10)
+        self.assertEqual(len(cached["feed"][0]["items"]), 1)
+        self.assertEqual(cached["feed"][0]["feed"], feed["feed"])
+        self.assertListEqual(
+            one_shot.get_cached_feed("20220920", None, 10)["feed"], [])
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    def test_should_read_while_feed_is_replaced(self):
+        feed = json.loads(parsed_feed.parsed_feed, strict=False)
+        one_shot.cache_feed(feed, date="20220919")
+        errors = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    for content in one_shot.get_cached_feed(
+                            "20220919", None, 10)["feed"]:
+                        self.assertEqual(len(content["items"]), 1)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for _ in range(100):
+            one_shot.cache_feed(feed, date="20220919")
+        done.set()
+        for reader in readers:
+            reader.join()
+        self.assertListEqual(errors, [])
+        self.assertListEqual(os.listdir(os.path.join(cache_dir, "20220919")),
+                             [os.path.basename(one_shot.get_feed_dir(
+                                 "20220919", feed["url"]))])
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
+    def test_should_migrate_legacy_cache(self):
+        feed = json.loads(parsed_feed.parsed_feed, strict=False)
+        newer = dict(feed, feed="Newer feed")
+        one_shot.cache_feed(newer, date="20220920")
+        with open(legacy_db_path, "w") as file:
+            json.dump({"_default": {
+                "1": {"cache_date": "20220919", "feed_url": feed["url"],
+                      "feed_content": feed},
+                "2": {"cache_date": "20220920", "feed_url": feed["url"],
+                      "feed_content": feed},
+            }}, file)
+        try:
+            one_shot.migrate_legacy_cache()
+            self.assertFalse(os.path.exists(legacy_db_path))
+            self.assertTrue(os.path.exists(legacy_db_path + ".migrated"))
+        finally:
+            for path in (legacy_db_path, legacy_db_path + ".migrated"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        cached = one_shot.get_cached_feed("20220919", None, 10)["feed"]
+        self.assertEqual(cached[0]["feed"], feed["feed"])
+        self.assertIn("summary_text", cached[0]["items"][0])
+        # feed cached after the legacy one is kept
+        cached = one_shot.get_cached_feed("20220920", None, 10)["feed"]
+        self.assertEqual(cached[0]["feed"], "Newer feed")
+
+    def test_should_return_peak_rss(self):
+        self.assertGreater(one_shot.get_peak_rss(), 0)
+
+    @patch('rss_reader.one_shot.cache_dir', cache_dir)
+    @patch('rss_reader.one_shot.legacy_db_path', legacy_db_path)
     @patch("rss_reader.one_shot.feedparser")
     def test_should_raise_on_invalid_xml(self, mocked_parser):
         mocked_parser.parse.return_value = self.parsed_invalid_feed
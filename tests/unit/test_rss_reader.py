@@ -46,6 +46,35 @@ class TestArgParser(unittest.TestCase):
         args = ["http://www.example.com", "--verbose"]
         self.assertTrue(arg_parser.parse_args(args).verbose)
 
+    def test_export_arg(self):
+        """ Try to pass --export arg without url. """
+        args = ["--export", "cache.jsonl.gz", "--export-format", "csv"]
+        parsed_args = arg_parser.parse_args(args)
+        self.assertEqual(parsed_args.export, "cache.jsonl.gz")
+        self.assertEqual(parsed_args.export_format, "csv")
+
+    @patch('sys.stderr', new_callable=StringIO)
+    def test_date_args_should_accept_only_yyyymmdd(self, mock_stderr):
+        """ Try to pass dates in other formats and then valid ones. """
+        for option in ["--date", "--from-date", "--to-date"]:
+            for value in ["2022-09-19", "20221319", "/tmp/cache"]:
+                with self.assertRaises(SystemExit):
+                    arg_parser.parse_args(["--export", "out", option, value])
+                self.assertRegex(mock_stderr.getvalue(), r"expected YYYYMMDD")
+        args = ["--export", "out", "--from-date", "20220919", "--to-date", "20220920"]
+        parsed_args = arg_parser.parse_args(args)
+        self.assertEqual(parsed_args.date_from, "20220919")
+        self.assertEqual(parsed_args.date_to, "20220920")
+
+    def test_fetch_media_arg(self):
+        """ Try to pass --fetch-media arg before url. """
+        args = ["--fetch-media", "http://www.example.com"]
+        parsed_args = arg_parser.parse_args(args)
+        self.assertTrue(parsed_args.fetch_media)
+        self.assertEqual(parsed_args.url, "http://www.example.com")
+        args = ["http://www.example.com", "--fetch-media", "--media-dir", "media"]
+        self.assertEqual(arg_parser.parse_args(args).media_dir, "media")
+
     @patch('sys.stdout', new_callable=StringIO)
     def test_version_arg(self, mock_stdout):
         """
@@ -0,0 +1,136 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import unittest
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+from unittest.mock import patch
+from rss_reader import one_shot
+from rss_reader import server
+from tests.fixtures import parsed_feed
+
+tempdir = "/tmp" if platform.system() == "Darwin" else tempfile.gettempdir()
+cache_dir = os.path.join(tempdir, "test_cache")
+
+class TestParseAddress(unittest.TestCase):
+    def test_should_parse_address(self):
+        self.assertEqual(server.parse_address("0.0.0.0:8000"), ("0.0.0.0", 8000))
+        self.assertEqual(server.parse_address("8000"), ("localhost", 8000))
+        self.assertEqual(server.parse_address(":8000"), ("localhost", 8000))
+
+    def test_should_raise_on_invalid_address(self):
+        with self.assertRaises(server.InvalidServerAddress):
+            server.parse_address("localhost:port")
+        with self.assertRaises(server.InvalidServerAddress):
+            server.parse_address(":70000")
+        with self.assertRaises(server.InvalidServerAddress):
+            server.parse_address("-1")
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.feed = json.loads(parsed_feed.parsed_feed, strict=False)
+        self.cache_dir_patch = patch('rss_reader.one_shot.cache_dir', cache_dir)
+        self.cache_dir_patch.start()
+        one_shot.cache_feed(self.feed, date="20220919")
+        self.server = server.make_server("127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,),
+                         daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache_dir_patch.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def get(self, path, headers={}):
+        return urlopen(Request(self.url + path, headers=headers))
+
+    def test_should_return_cached_feed(self):
+        with self.get("/feed?date=20220919") as response:
+            result = json.loads(response.read())
+        self.assertEqual(result["date"], "20220919")
+        self.assertDictEqual(result["feed"][0], self.feed)
+
+        with self.get("/feed?date=20220919&limit=0") as response:
+            result = json.loads(response.read())
+        self.assertListEqual(result["feed"][0]["items"], [])
+
+        with self.get("/feed?date=20220919&url=http://www.example.com") as response:
+            result = json.loads(response.read())
+        self.assertListEqual(result["feed"], [])
+
+    def test_should_filter_by_search(self):
+        with self.get("/feed?date=20220919&search=FUNERAL") as response:
+            result = json.loads(response.read())
+        self.assertEqual(len(result["feed"][0]["items"]), 1)
+
+        with self.get("/feed?date=20220919&search=nothing") as response:
+            result = json.loads(response.read())
+        self.assertListEqual(result["feed"][0]["items"], [])
+
+    def test_should_return_not_modified_for_known_etag(self):
+        with self.get("/feed?date=20220919") as response:
+            etag = response.headers["ETag"]
+        with self.assertRaises(HTTPError) as error:
+            self.get("/feed?date=20220919", {"If-None-Match": etag})
+        self.assertEqual(error.exception.code, 304)
+
+    def test_should_drop_index_on_cache_change(self):
+        with self.get("/feed?date=20220920") as response:
+            self.assertListEqual(json.loads(response.read())["feed"], [])
+        one_shot.cache_feed(self.feed, date="20220920")
+        with self.get("/feed?date=20220920") as response:
+            self.assertEqual(len(json.loads(response.read())["feed"]), 1)
+        one_shot.cache_feed(self.feed, append=True, date="20220920")
+        with self.get("/feed?date=20220920") as response:
+            result = json.loads(response.read())
+        self.assertEqual(len(result["feed"][0]["items"]), 2)
+
+    def test_should_return_errors(self):
+        with self.assertRaises(HTTPError) as error:
+            self.get("/unknown")
+        self.assertEqual(error.exception.code, 404)
+        for query in ["limit=abc", "limit=-1", "date=2022-09-19",
+                      "date=/tmp", "date=../../etc"]:
+            with self.assertRaises(HTTPError) as error:
+                self.get(f"/feed?{query}")
+            self.assertEqual(error.exception.code, 400)
+
+    def test_should_not_read_outside_cache(self):
+        outside_dir = tempfile.mkdtemp()
+        try:
+            feed_dir = os.path.join(outside_dir, "x")
+            os.makedirs(feed_dir)
+            with open(os.path.join(feed_dir, "feed.json"), "w") as file:
+                json.dump({"feed": "secret", "url": "secret"}, file)
+            with open(os.path.join(feed_dir, "000000.json"), "w") as file:
+                json.dump([], file)
+            with self.assertRaises(HTTPError) as error:
+                self.get(f"/feed?date={outside_dir}")
+            self.assertEqual(error.exception.code, 400)
+            with self.assertRaises(one_shot.InvalidCacheDate):
+                one_shot.get_cached_feed(outside_dir, None, 10)
+        finally:
+            shutil.rmtree(outside_dir)
+
+    def test_should_load_day_once_for_concurrent_requests(self):
+        index = server.CacheIndex()
+        signature = server.get_day_signature("20220919")
+        with patch('rss_reader.one_shot.get_cached_feed',
+                   wraps=one_shot.get_cached_feed) as mocked:
+            threads = [threading.Thread(target=index.get_day,
+                                        args=("20220919", signature))
+                       for k in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(mocked.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()